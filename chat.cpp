@@ -420,13 +420,15 @@ void Qwen3_VL::forward_embed(ArrayInt const &tokens) {
   auto p_buffer = tokens.request();
   auto p_tokens = static_cast<int *>(p_buffer.ptr);
   std::copy(p_tokens, p_tokens + num, input_ids.data());
+  // inputs are copied, release the GIL while the TPU runs
+  py::gil_scoped_release release;
 
   auto &in_mem = net_embed->stages[0].input_mems[0];
   auto &out_mem = net_embed->stages[0].output_mems[0];
   bm_memcpy_s2d(bm_handle, in_mem, (void *)input_ids.data());
   net_launch(net_embed);
   d2d(dev_buffer, out_mem);
-  token_length = tokens.size();
+  token_length = num;
   for (auto &mem : deepstack_buffers) {
     empty(bm_handle, mem);
   }
@@ -451,6 +453,13 @@ void Qwen3_VL::forward_vit(ArrayFloat const &pixel_values,
   auto p_position_ids = position_ids.request();
   auto p_pos_idx = pos_idx.request();
   auto p_pos_weight = pos_weight.request();
+  size_t pixel_values_size = pixel_values.size();
+  size_t position_ids_size = position_ids.size();
+  size_t pos_idx_size = pos_idx.size();
+  size_t pos_weight_size = pos_weight.size();
+  // buffers stay alive (held by the caller) and are only read from here on,
+  // release the GIL while the TPU runs
+  py::gil_scoped_release release;
 
   empty_net(bm_handle, net_vit);
   auto &vit_in0_mem = net_vit->stages[0].input_mems[0]; // pixel_values
@@ -460,13 +469,13 @@ void Qwen3_VL::forward_vit(ArrayFloat const &pixel_values,
   auto &vit_in4_mem = net_vit->stages[0].input_mems[4]; // mask
   auto &vit_out_mem = net_vit->stages[0].output_mems[0];
   bm_memcpy_s2d_partial(bm_handle, vit_in0_mem, (void *)p_pixel_values.ptr,
-                        pixel_values.size() * sizeof(float));
+                        pixel_values_size * sizeof(float));
   bm_memcpy_s2d_partial(bm_handle, vit_in1_mem, (void *)p_position_ids.ptr,
-                        position_ids.size() * sizeof(int));
+                        position_ids_size * sizeof(int));
   bm_memcpy_s2d_partial(bm_handle, vit_in2_mem, (void *)p_pos_idx.ptr,
-                        pos_idx.size() * sizeof(int));
+                        pos_idx_size * sizeof(int));
   bm_memcpy_s2d_partial(bm_handle, vit_in3_mem, (void *)p_pos_weight.ptr,
-                        pos_weight.size() * sizeof(float));
+                        pos_weight_size * sizeof(float));
   if (vit_dynamic) {
     std::vector<float> attention_mask(hw * hw, 0.0f);
     bm_memcpy_s2d_partial(bm_handle, vit_in4_mem, (void *)attention_mask.data(),
@@ -532,6 +541,8 @@ int Qwen3_VL::forward_first(ArrayInt const &position_ids) {
                 position_ids_pad.begin() + dst_offset);
     }
   }
+  // inputs are copied, release the GIL while the TPU runs
+  py::gil_scoped_release release;
   auto out_mem = dev_buffer;
   empty_net(bm_handle, net_blocks[0]);
   for (int idx = 0; idx < NUM_LAYERS; idx++) {
@@ -621,6 +632,8 @@ int Qwen3_VL::forward_first_with_kv(ArrayInt const &position_ids) {
     std::copy(p_ids + ori_offset, p_ids + ori_offset + ori_length,
               position_ids_pad.begin() + dst_offset);
   }
+  // inputs are copied, release the GIL while the TPU runs
+  py::gil_scoped_release release;
 
   auto out_mem = dev_buffer;
   empty_net(bm_handle, net_blocks[0]);
@@ -683,7 +696,10 @@ int Qwen3_VL::forward_next(ArrayInt const &position_ids) {
   }
   assert(position_ids.size() == 3);
   auto p_position_ids = position_ids.request();
-  auto p_ids = static_cast<int *>(p_position_ids.ptr);
+  int p_ids[3];
+  std::copy_n(static_cast<int *>(p_position_ids.ptr), 3, p_ids);
+  // inputs are copied, release the GIL while the TPU runs
+  py::gil_scoped_release release;
   // embedding
   auto &lm_in_mem = net_lm->stages[0].input_mems[0];
   auto &lm_out_mem = net_lm->stages[0].output_mems[0];
@@ -724,12 +740,15 @@ int Qwen3_VL::forward_next(ArrayInt const &position_ids) {
 PYBIND11_MODULE(chat, m) {
   pybind11::class_<Qwen3_VL>(m, "Qwen3_VL")
       .def(pybind11::init<>())
-      .def("init", &Qwen3_VL::init)
+      // init/clear_history touch no Python objects; the forward_* functions
+      // release the GIL themselves once their numpy inputs are read
+      .def("init", &Qwen3_VL::init, py::call_guard<py::gil_scoped_release>())
       .def("forward_embed", &Qwen3_VL::forward_embed)
       .def("forward_vit", &Qwen3_VL::forward_vit)
       .def("forward_first", &Qwen3_VL::forward_first)
       .def("forward_next", &Qwen3_VL::forward_next)
-      .def("clear_history", &Qwen3_VL::clear_history)
+      .def("clear_history", &Qwen3_VL::clear_history,
+           py::call_guard<py::gil_scoped_release>())
       .def("deinit", &Qwen3_VL::deinit)
       .def_readonly("SEQLEN", &Qwen3_VL::SEQLEN) // read SEQLEN in pipeline.py
       .def_readonly("MAX_PIXELS", &Qwen3_VL::MAX_PIXELS)
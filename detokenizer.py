@@ -0,0 +1,47 @@
+from typing import Optional
+
+
+class IncrementalDetokenizer:
+    """
+    增量解码器：缓存尚未组成完整UTF-8字符的token，凑齐后只输出新增文本
+    每次成功输出即清空缓存，单token解码开销只与未成字的token数有关，与已生成长度无关
+    """
+    # 缓存达到该数量仍不成字时（token边界持续跨越字符边界），先输出末尾不完整序列之前的已确定文本
+    MAX_PENDING_TOKENS = 4
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.pending_tokens = []
+        self.emitted_len = 0  # 当前缓存解码结果中已输出的字符数
+
+    def decode(self, tokens) -> str:
+        return self.tokenizer.decode(tokens, skip_special_tokens=True)
+
+    def push(self, token: int) -> Optional[str]:
+        """追加一个token，返回新增文本；没有可输出的完整字符时返回None"""
+        self.pending_tokens.append(token)
+        text = self.decode(self.pending_tokens)
+        # 不完整的多字节序列只会出现在末尾（解码为U+FFFD），只检查最后一个字符
+        if not text.endswith("\ufffd"):
+            new_text = text[self.emitted_len:]
+            self.pending_tokens.clear()
+            self.emitted_len = 0
+            return new_text
+        if len(self.pending_tokens) < self.MAX_PENDING_TOKENS:
+            return None
+
+        # 缓存已满：只输出末尾U+FFFD之前的文本，不完整的尾部token继续保留，等待后续字节补齐
+        stable = text.rstrip("\ufffd")
+        new_text = stable[self.emitted_len:]
+        self.emitted_len = len(stable)
+        self._drop_settled_tokens(stable)
+        return new_text or None
+
+    def _drop_settled_tokens(self, stable: str):
+        """丢弃解码结果已完整输出的前缀token，控制缓存长度"""
+        for i in range(len(self.pending_tokens) - 1, 0, -1):
+            head = self.decode(self.pending_tokens[:i])
+            if not head.endswith("\ufffd") and stable.startswith(head):
+                del self.pending_tokens[:i]
+                self.emitted_len -= len(head)
+                return
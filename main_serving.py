@@ -1,24 +1,36 @@
 import time
 import os
 import sys
-import json
+import orjson
 import tempfile
-from fastapi import Depends
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header
-from fastapi.responses import StreamingResponse
+import base64
+import io
+import hmac
+import hashlib
+import threading
+import functools
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi.responses import Response, StreamingResponse, ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.concurrency import iterate_in_threadpool
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, AsyncIterator, Callable
 import uvicorn
+from anyio import to_thread
 import asyncio
 from contextlib import asynccontextmanager
 import logging
 import argparse
 import traceback
 import numpy as np
-import requests
+import httpx
 from concurrent.futures import ThreadPoolExecutor
-import threading
+from collections import OrderedDict
+import queue
 import mimetypes
+from PIL import Image
+from detokenizer import IncrementalDetokenizer
 
 # ========== 命令行参数解析 ==========
 def parse_args():
@@ -40,6 +52,14 @@ def parse_args():
         help="最大并发请求数 (默认: 10)"
     )
     
+    # anyio线程池大小（流式迭代、上传文件读取等共用）
+    parser.add_argument(
+        "--threadpool-size", 
+        type=int, 
+        default=None,
+        help="Starlette/anyio默认线程池大小 (默认: max(64, 最大并发数*4))"
+    )
+    
     # 日志级别
     parser.add_argument(
         "-l", "--log_level", 
@@ -108,8 +128,71 @@ logger = logging.getLogger(__name__)
 # ========== 全局配置（基于命令行参数） ==========
 # 并发控制配置
 MAX_CONCURRENT_REQUESTS = args.max_concurrent
-EXECUTOR = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS)
-REQUEST_LOCK = asyncio.Lock()
+EXECUTOR = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix="infer")
+# IO线程池：Base64解码、本地文件检查等，与推理线程池隔离，避免占用推理槽位
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix="io")
+# anyio默认线程池（默认上限40）随并发数扩展，避免流式请求和上传读取在高并发下排队
+THREADPOOL_SIZE = args.threadpool_size or max(64, MAX_CONCURRENT_REQUESTS * 4)
+
+# 并发请求不做跨请求的micro-batching：bmodel按batch=1编译，forward_first/forward_next每次只处理一条序列，
+# 且KV cache属于单个模型实例；吞吐扩展依赖模型池中的多个实例在各自线程中调用TPU（chat.cpp的TPU调用期间释放GIL，
+# 线程之间和事件循环不会因GIL互相阻塞），由该信号量限制同时推理的请求数
+# （asyncio.Semaphore按等待顺序唤醒，且有等待者时新到达的请求不会插队）
+# 模型加载完成后由load_model_global按实际可用的实例数重建
+REQUEST_SEM = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+class RequestTicket:
+    """
+    REQUEST_SEM的一张并发票据（async with获取，退出时归还）
+    流式请求把release交给生成器并标记handed_off，由生成器归还模型实例时一并归还票据，
+    使信号量真正限制占用中的模型实例数；release只生效一次，可在任意线程调用
+    """
+    def __init__(self):
+        self.handed_off = False
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._released = False
+
+    async def __aenter__(self):
+        self._sem = REQUEST_SEM
+        await self._sem.acquire()
+        self._loop = asyncio.get_running_loop()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if not self.handed_off:
+            self.release()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._sem.release)
+
+# 全局复用的异步HTTP客户端（连接池+HTTP/2），在lifespan中创建和关闭
+HTTPX_CLIENT: Optional[httpx.AsyncClient] = None
+
+# 媒体文件读写的分块大小（上传/下载均按块流式处理，避免整文件驻留内存）
+MEDIA_CHUNK_SIZE = 1 << 20
+
+# base64图片解码缓存（按BLAKE2b摘要索引的LRU），客户端重复发送同一张图片时直接复用已解码的PIL图片；
+# 解码后的图片按原始分辨率驻留内存，容量保持较小
+BASE64_IMAGE_CACHE_SIZE = 8
+BASE64_IMAGE_CACHE: "OrderedDict[bytes, Image.Image]" = OrderedDict()
+BASE64_IMAGE_CACHE_LOCK = threading.Lock()
+
+# 秒级缓存时钟：由lifespan中的后台任务每秒刷新，响应里的时间戳直接读取，避免每个请求调用time.time()
+CACHED_NOW = int(time.time())
+
+async def refresh_cached_now():
+    """每秒刷新一次CACHED_NOW，直到任务被取消"""
+    global CACHED_NOW
+    while True:
+        CACHED_NOW = int(time.time())
+        await asyncio.sleep(1)
 
 # 新增：API Key全局配置
 API_CONFIG = {
@@ -137,8 +220,10 @@ MODEL_CONFIG = {
     "log_level": args.log_level
 }
 
-# 每个线程存储独立的模型实例（线程局部存储）
-THREAD_LOCAL = threading.local()
+# 模型实例池：启动时创建MAX_CONCURRENT_REQUESTS个实例，请求按需借出/归还
+# 实例总数与线程数量无关，TPU内存占用恒定为 N * 单模型大小
+MODEL_POOL: "queue.Queue" = queue.Queue(maxsize=MAX_CONCURRENT_REQUESTS)
+MODEL_INSTANCES = []  # 已成功创建的模型实例（用于健康检查）
 
 def create_model_args():
     """创建模型参数"""
@@ -149,101 +234,114 @@ def create_model_args():
     args.video_ratio = MODEL_CONFIG["video_ratio"]
     return args
 
-def get_thread_local_model():
-    """获取当前线程的模型实例（懒加载）"""
-    if not hasattr(THREAD_LOCAL, "model_instance"):
+def warmup_model_instance(model):
+    """用一条短文本跑一次预处理+预填充，提前完成首次推理的一次性开销"""
+    model.input_str = "你好"
+    inputs = model.process(model.text_message(), "text")
+    token_len = inputs.input_ids.numel()
+    model.model.forward_embed(inputs.input_ids)
+    model.model.forward_first(np.tile(np.arange(token_len, dtype=np.int32), (3, 1)))
+    model.model.clear_history()
+    model.history_max_posid = 0
+
+def create_model_instance(index: int):
+    """创建一个模型实例，预热后放入模型池"""
+    try:
+        logger.info("模型实例 %d 初始化中...", index)
+        from pipeline import Qwen3_VL  # 导入pipline.py的模型类
+        model = Qwen3_VL(create_model_args())
         try:
-            logger.info(f"线程 {threading.get_ident()} 初始化模型实例...")
-            from pipeline import Qwen3_VL  # 导入pipline.py的模型类
-            args = create_model_args()
-            THREAD_LOCAL.model_instance = Qwen3_VL(args)
-            logger.info(f"线程 {threading.get_ident()} 模型初始化完成")
+            warmup_model_instance(model)
         except Exception as e:
-            logger.error(f"线程 {threading.get_ident()} 模型初始化失败: {e}")
-            raise
-    return THREAD_LOCAL.model_instance
-
-async def load_model_global():
-    """预加载第一个线程的模型（服务启动时）"""
-    try:
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(EXECUTOR, get_thread_local_model)
-        logger.info("✅ 全局模型预加载成功！")
+            logger.warning("模型实例 %d 预热失败（不影响使用）: %s", index, e)
+        MODEL_INSTANCES.append(model)
+        MODEL_POOL.put(model)
+        logger.info("模型实例 %d 初始化完成", index)
     except Exception as e:
-        logger.error(f"❌ 全局模型预加载失败: {e}")
-        logger.error(traceback.format_exc())
+        logger.error("模型实例 %d 初始化失败: %s", index, e)
+        raise
 
-# 新增：API Key验证工具函数
-def validate_api_key(headers: Dict[str, str]) -> bool:
+async def load_model_global():
+    """并行创建全部模型实例（服务启动时），并按实际加载成功的实例数设置并发信号量"""
+    global REQUEST_SEM
+    results = await asyncio.gather(
+        *[run_infer(create_model_instance, i) for i in range(MAX_CONCURRENT_REQUESTS)],
+        return_exceptions=True
+    )
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if not failures:
+        logger.info("✅ 全局模型预加载成功！共 %d 个实例", len(MODEL_INSTANCES))
+    elif MODEL_INSTANCES:
+        logger.warning("⚠️ 部分模型实例加载失败: %d/%d 可用", len(MODEL_INSTANCES), MAX_CONCURRENT_REQUESTS)
+    else:
+        logger.error("❌ 全局模型预加载失败: %s", failures[0])
+        logger.error("".join(traceback.format_exception(failures[0])))
+    # 部分实例加载失败时，信号量与可用实例数一致，放行的请求不会阻塞在MODEL_POOL.get()上；
+    # 没有可用实例时保留1个名额，让请求直接返回"模型未加载"错误而不是无限等待
+    REQUEST_SEM = asyncio.Semaphore(max(1, len(MODEL_INSTANCES)))
+
+# ========== API Key认证 ==========
+# 受保护的接口前缀（/、/health、/docs等不需要认证）
+PROTECTED_PATH_PREFIX = "/v1/"
+# 预计算的认证前缀（小写，含分隔空格）与密钥字节串
+AUTH_PREFIX_LOWER = f"{API_CONFIG['prefix'].lower()} "
+API_KEY_BYTES = API_CONFIG["api_key"].encode("utf-8") if API_CONFIG["enabled"] else b""
+
+def check_api_key(auth_header: Optional[str]) -> Optional[str]:
     """
-    验证API Key是否有效
-    :param headers: HTTP请求头字典
-    :return: 验证通过返回True，否则返回False
+    验证认证请求头（格式：前缀 + 空格 + 密钥，前缀大小写不敏感）
+    :param auth_header: 从指定HTTP头中提取的认证信息
+    :return: 验证通过返回None，否则返回错误信息
     """
-    # 若未启用API Key认证，直接返回通过
-    if not API_CONFIG["enabled"]:
-        return True
-    
-    # 提取请求头中的认证信息
-    auth_header = headers.get(API_CONFIG["header_name"], "")
     if not auth_header:
-        return False
-    
-    # 拆分前缀和密钥（支持大小写不敏感的前缀判断）
-    parts = auth_header.split(" ", 1)
-    if len(parts) != 2:
-        return False
-    
-    prefix, provided_key = parts
-    if prefix.lower() != API_CONFIG["prefix"].lower():
-        return False
-    
-    # 对比密钥（严格匹配）
-    return provided_key == API_CONFIG["api_key"]
-
-# 新增：依赖注入式API Key验证（适用于单个接口精细化控制）
-async def require_api_key(
-    api_header: Optional[str] = Header(None, alias=args.api_key_header)
-) -> None:
-    """
-    FastAPI依赖项：验证API Key，失败则抛出401异常
-    :param api_header: 从指定HTTP头中提取的认证信息
-    """
-    # 若未启用API Key认证，直接返回
-    if not API_CONFIG["enabled"]:
-        return
-    
-    # 验证逻辑
-    if not api_header:
-        raise HTTPException(
-            status_code=401,
-            detail=f"缺少必要的 {API_CONFIG['header_name']} 请求头",
-            headers={"WWW-Authenticate": API_CONFIG["prefix"]}
-        )
-    
-    parts = api_header.split(" ", 1)
-    if len(parts) != 2 or parts[0].lower() != API_CONFIG["prefix"].lower():
-        raise HTTPException(
-            status_code=401,
-            detail=f"无效的认证格式，正确格式：{API_CONFIG['prefix']} <你的API Key>",
-            headers={"WWW-Authenticate": API_CONFIG["prefix"]}
-        )
-    
-    provided_key = parts[1]
-    if provided_key != API_CONFIG["api_key"]:
-        raise HTTPException(
-            status_code=401,
-            detail="无效的API Key，访问被拒绝",
-            headers={"WWW-Authenticate": API_CONFIG["prefix"]}
-        )
+        return f"缺少必要的 {API_CONFIG['header_name']} 请求头"
+    if auth_header[:len(AUTH_PREFIX_LOWER)].lower() != AUTH_PREFIX_LOWER:
+        return f"无效的认证格式，正确格式：{API_CONFIG['prefix']} <你的API Key>"
+    # 常量时间比较，避免时序侧信道
+    if not hmac.compare_digest(auth_header[len(AUTH_PREFIX_LOWER):].encode("utf-8"), API_KEY_BYTES):
+        return "无效的API Key，访问被拒绝"
+    return None
+
+class ApiKeyMiddleware:
+    """ASGI中间件：在路由之前统一校验受保护接口的API Key，失败直接返回401"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(PROTECTED_PATH_PREFIX):
+            await self.app(scope, receive, send)
+            return
+        error = check_api_key(Headers(scope=scope).get(API_CONFIG["header_name"]))
+        if error:
+            response = ORJSONResponse(
+                status_code=401,
+                content={"detail": error},
+                headers={"WWW-Authenticate": API_CONFIG["prefix"]}
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """FastAPI生命周期管理"""
+    global HTTPX_CLIENT
+    HTTPX_CLIENT = httpx.AsyncClient(
+        http2=True,
+        timeout=15.0,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=64),
+        headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+    )
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    clock_task = asyncio.create_task(refresh_cached_now())
     # 启动时预加载模型
     await load_model_global()
     yield
     # 关闭时清理资源
+    clock_task.cancel()
+    await HTTPX_CLIENT.aclose()
+    IO_EXECUTOR.shutdown(wait=True)
     EXECUTOR.shutdown(wait=True)
     logger.info("✅ 服务已关闭，资源清理完成")
 
@@ -251,8 +349,15 @@ app = FastAPI(
     title="Qwen3-VL TPU推理服务",
     version="2.2.0",
     description="基于算能SE7盒子的Qwen3-VL视觉语言模型推理服务（支持多并发+本地媒体文件+API Key认证）",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson序列化所有JSON响应
 )
+# 压缩较大的JSON响应（描述/对话文本压缩率高）；requirements.txt固定的Starlette版本中GZipMiddleware跳过text/event-stream，
+# 流式输出仍逐块发送（较早的Starlette版本会压缩并缓冲SSE，勿降级）
+app.add_middleware(GZipMiddleware, minimum_size=512)
+# 后添加的中间件在外层：先校验API Key，未授权请求不进入压缩层
+if API_CONFIG["enabled"]:
+    app.add_middleware(ApiKeyMiddleware)
 
 # ========== 数据模型定义 ==========
 class ChatMessage(BaseModel):
@@ -279,50 +384,142 @@ class ChatCompletionResponse(BaseModel):
     choices: List[ChatCompletionChoice]
     usage: Dict[str, int]
 
+# ========== 媒体类型识别表 ==========
+# 扩展名 -> MIME类型（mimetypes无法识别时兜底）
+MEDIA_EXT_MAP = {
+    # 图片
+    '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png',
+    '.bmp': 'image/bmp', '.gif': 'image/gif', '.webp': 'image/webp',
+    # 视频
+    '.mp4': 'video/mp4', '.avi': 'video/x-msvideo', '.mov': 'video/quicktime',
+    '.mkv': 'video/x-matroska', '.flv': 'video/x-flv', '.wmv': 'video/x-ms-wmv'
+}
+IMAGE_EXTS = frozenset(ext for ext, ct in MEDIA_EXT_MAP.items() if ct.startswith('image/'))
+VIDEO_EXTS = frozenset(ext for ext, ct in MEDIA_EXT_MAP.items() if ct.startswith('video/'))
+# 媒体URL前缀
+LOCAL_URL_PREFIXES = ("file://", "/", "./", "../")
+REMOTE_URL_PREFIXES = ("http://", "https://")
+
 # ========== 工具函数 ==========
-def save_base64_image(base64_str: str) -> str:
-    """保存base64图片到临时文件"""
-    import base64
-    import io
+async def run_infer(func, *args):
+    """
+    在推理线程池中执行模型加载/推理，线程数与模型实例数一致
+    只显式提交推理任务，不替换事件循环的默认执行器，避免其他to_thread/run_in_executor调用占用推理线程
+    """
+    return await asyncio.get_running_loop().run_in_executor(EXECUTOR, func, *args)
+
+async def run_io(func, *args):
+    """在IO线程池中执行阻塞的文件/解码操作，避免阻塞事件循环"""
+    return await asyncio.get_running_loop().run_in_executor(IO_EXECUTOR, func, *args)
+
+def remove_file_quietly(path: str):
+    """删除文件，文件不存在或删除失败时忽略"""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def discard_tempfile(tmp):
+    """关闭并删除未写完的临时文件，忽略关闭失败"""
+    try:
+        tmp.close()
+    except OSError:
+        pass
+    remove_file_quietly(tmp.name)
+
+async def save_chunks_to_tempfile(chunks: AsyncIterator[bytes], suffix: str) -> str:
+    """
+    将异步字节块流写入临时文件，文件系统调用均在IO线程池执行
+    写入失败或被取消时删除不完整的文件并重新抛出异常
+    :return: 临时文件路径
+    """
+    tmp = await run_io(functools.partial(tempfile.NamedTemporaryFile, delete=False, suffix=suffix))
+    # 最近一次提交到IO线程池的文件操作；协程被取消后该操作可能仍在线程中执行
+    last_op = None
+    try:
+        async for chunk in chunks:
+            last_op = IO_EXECUTOR.submit(tmp.write, chunk)
+            await asyncio.wrap_future(last_op)
+        last_op = IO_EXECUTOR.submit(tmp.close)
+        await asyncio.wrap_future(last_op)
+    except BaseException:
+        async def cleanup():
+            # 先等待仍在执行的写入/关闭结束，再在IO线程池中关闭并删除文件
+            if last_op is not None:
+                await asyncio.wait([asyncio.wrap_future(last_op)])
+            await run_io(discard_tempfile, tmp)
+        # shield：请求被取消时清理任务仍会执行完毕
+        await asyncio.shield(cleanup())
+        raise
+    return tmp.name
+
+async def iter_upload_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    """按MEDIA_CHUNK_SIZE分块读取上传文件"""
+    while chunk := await file.read(MEDIA_CHUNK_SIZE):
+        yield chunk
+
+# SSE结束标记（预编码为bytes，StreamingResponse直接发送，无需再次encode）
+SSE_DONE = b"data: [DONE]\n\n"
+
+def sse_event(obj: Any) -> bytes:
+    """将对象编码为一条SSE事件（orjson直接输出UTF-8字节，等价于ensure_ascii=False）"""
+    return b"data: " + orjson.dumps(obj) + b"\n\n"
+
+def decode_image_bytes(image_data: bytes) -> Image.Image:
+    """在内存中解码图片字节，返回PIL图片对象（无需落盘临时文件）"""
+    image = Image.open(io.BytesIO(image_data))
+    image.load()  # 立即解码，尽早发现无效数据
+    return image
+
+def decode_base64_image(base64_str: str) -> Image.Image:
+    """在内存中解码base64图片，返回PIL图片对象（在IO线程池中执行，相同内容命中缓存时跳过解码）"""
+    key = hashlib.blake2b(base64_str.encode(), digest_size=16).digest()
+    with BASE64_IMAGE_CACHE_LOCK:
+        image = BASE64_IMAGE_CACHE.get(key)
+        if image is not None:
+            BASE64_IMAGE_CACHE.move_to_end(key)
+            return image
     try:
         if ',' in base64_str:
             base64_str = base64_str.split(',', 1)[1]
-        image_data = base64.b64decode(base64_str)
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as f:
-            f.write(image_data)
-            return f.name
+        image = decode_image_bytes(base64.b64decode(base64_str))
     except Exception as e:
-        logger.error(f"保存base64图片失败: {e}")
+        logger.error("解码base64图片失败: %s", e)
         raise HTTPException(status_code=400, detail=f"无效的base64图片数据: {str(e)}")
-
-def download_media_from_url(url: str) -> tuple[str, str]:
-    """从URL下载媒体文件（图片/视频）到临时文件，返回(文件路径, 媒体类型)"""
+    # 缓存的图片在请求间共享，下游（qwen_vl_utils的convert/resize）只读取并生成新图片，不会修改它
+    with BASE64_IMAGE_CACHE_LOCK:
+        BASE64_IMAGE_CACHE[key] = image
+        if len(BASE64_IMAGE_CACHE) > BASE64_IMAGE_CACHE_SIZE:
+            BASE64_IMAGE_CACHE.popitem(last=False)
+    return image
+
+async def download_media_from_url(url: str) -> tuple[str, str]:
+    """通过全局httpx异步客户端流式下载媒体文件（图片/视频）到临时文件，返回(文件路径, 媒体类型)"""
     try:
-        logger.info(f"正在从URL下载媒体: {url}")
-        response = requests.get(url, timeout=15, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        response.raise_for_status()
-
-        # 识别媒体类型
-        content_type = response.headers.get('Content-Type', '')
-        if content_type.startswith('image/'):
-            media_type = "image"
-            suffix = '.jpg' if 'jpeg' in content_type or 'jpg' in content_type else '.png'
-        elif content_type.startswith('video/'):
-            media_type = "video"
-            suffix = '.mp4' if 'mp4' in content_type else '.avi'
-        else:
-            raise HTTPException(status_code=400, detail=f"不支持的媒体类型: {content_type}")
-
-        # 保存到临时文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as f:
-            f.write(response.content)
-            logger.info(f"媒体已下载并保存到: {f.name}")
-            return f.name, media_type
-    except requests.exceptions.Timeout:
+        logger.info("正在从URL下载媒体: %s", url)
+        async with HTTPX_CLIENT.stream("GET", url) as response:
+            response.raise_for_status()
+
+            # 识别媒体类型（响应头在读取响应体之前即可获取）
+            content_type = response.headers.get('Content-Type', '')
+            if content_type.startswith('image/'):
+                media_type = "image"
+                suffix = '.jpg' if 'jpeg' in content_type or 'jpg' in content_type else '.png'
+            elif content_type.startswith('video/'):
+                media_type = "video"
+                suffix = '.mp4' if 'mp4' in content_type else '.avi'
+            else:
+                raise HTTPException(status_code=400, detail=f"不支持的媒体类型: {content_type}")
+
+            # 分块写入临时文件，下载失败时删除不完整的文件
+            temp_path = await save_chunks_to_tempfile(response.aiter_bytes(MEDIA_CHUNK_SIZE), suffix)
+            logger.info("媒体已下载并保存到: %s", temp_path)
+            return temp_path, media_type
+    except HTTPException:
+        raise
+    except httpx.TimeoutException:
         raise HTTPException(status_code=408, detail="下载媒体超时，请检查URL是否可访问")
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=400, detail=f"无法下载媒体: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"下载媒体时发生错误: {str(e)}")
@@ -344,20 +541,10 @@ def load_local_media(file_path: str) -> tuple[str, str]:
             raise HTTPException(status_code=403, detail=f"无读取权限: {file_path}")
         
         # 识别媒体类型（优先mimetypes，兜底扩展名）
-        content_type, _ = mimetypes.guess_type(file_path)
+        ext = os.path.splitext(file_path)[1].lower()
+        content_type = mimetypes.guess_type(file_path)[0] or MEDIA_EXT_MAP.get(ext)
         if not content_type:
-            ext = os.path.splitext(file_path)[1].lower()
-            ext_map = {
-                # 图片
-                '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png',
-                '.bmp': 'image/bmp', '.gif': 'image/gif', '.webp': 'image/webp',
-                # 视频
-                '.mp4': 'video/mp4', '.avi': 'video/x-msvideo', '.mov': 'video/quicktime',
-                '.mkv': 'video/x-matroska', '.flv': 'video/x-flv', '.wmv': 'video/x-ms-wmv'
-            }
-            if ext not in ext_map:
-                raise HTTPException(status_code=400, detail=f"不支持的文件扩展名: {ext} (文件: {file_path})")
-            content_type = ext_map[ext]
+            raise HTTPException(status_code=400, detail=f"不支持的文件扩展名: {ext} (文件: {file_path})")
         
         # 确定媒体类型
         if content_type.startswith('image/'):
@@ -367,23 +554,25 @@ def load_local_media(file_path: str) -> tuple[str, str]:
         else:
             raise HTTPException(status_code=400, detail=f"不支持的本地媒体类型: {content_type} (文件: {file_path})")
         
-        logger.info(f"成功加载本地媒体: {file_path} (类型: {media_type})")
+        logger.info("成功加载本地媒体: %s (类型: %s)", file_path, media_type)
         return file_path, media_type
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"加载本地媒体失败: {str(e)} (文件: {file_path})")
 
-def extract_content_and_media(messages: List[ChatMessage]) -> tuple[str, Optional[str], str]:
+async def extract_content_and_media(messages: List[ChatMessage]) -> tuple[str, Optional[Union[str, Image.Image]], str, bool]:
     """
     从OpenAI格式的消息中提取文本、媒体路径、媒体类型
     支持：1.本地路径(file:///绝对路径/相对路径) 2.Base64 3.远程URL
-    返回: (text_content, media_path, media_type)
+    返回: (text_content, media_path, media_type, owns_tempfile)
+    Base64图片的media_path为内存中的PIL图片；owns_tempfile仅在media_path为本服务创建的临时文件（远程URL下载）时为True
     """
     system_prompt = ""
     text_parts = []
     media_path = None
     media_type = "text"
+    owns_tempfile = False
 
     for msg in messages:
         if msg.role == "system":
@@ -409,15 +598,16 @@ def extract_content_and_media(messages: List[ChatMessage]) -> tuple[str, Optiona
                         url = image_url_data.get("url", "") if isinstance(image_url_data, dict) else image_url_data
                         
                         # 1. 本地文件（最高优先级）
-                        if url.startswith(("file://", "/", "./", "../")):
-                            media_path, media_type = load_local_media(url)
+                        if url.startswith(LOCAL_URL_PREFIXES):
+                            media_path, media_type = await run_io(load_local_media, url)
                         # 2. Base64图片
                         elif url.startswith("data:image"):
-                            media_path = save_base64_image(url)
+                            media_path = await run_io(decode_base64_image, url)
                             media_type = "image"
                         # 3. 远程URL（图片/视频）
-                        elif url.startswith(("http://", "https://")):
-                            media_path, media_type = download_media_from_url(url)
+                        elif url.startswith(REMOTE_URL_PREFIXES):
+                            media_path, media_type = await download_media_from_url(url)
+                            owns_tempfile = True
 
     # 组合文本内容
     user_content = " ".join(text_parts).strip()
@@ -425,18 +615,27 @@ def extract_content_and_media(messages: List[ChatMessage]) -> tuple[str, Optiona
         # 无文本时默认生成描述指令
         user_content = "请详细描述这个媒体文件的内容。"
     if system_prompt:
-        logger.warning(f"System prompt暂时禁用: {system_prompt}")
-    return user_content, media_path, media_type
+        logger.warning("System prompt暂时禁用: %s", system_prompt)
+    return user_content, media_path, media_type, owns_tempfile
 
 # ========== 核心推理函数（同步，运行在线程池） ==========
-def process_inference_sync(prompt: str, media_path: Optional[str], media_type: str, stream: bool = False):
+def process_inference_sync(prompt: str, media_path: Optional[Union[str, Image.Image]], media_type: str,
+                           stream: bool = False, owns_tempfile: bool = False,
+                           release_ticket: Optional[Callable[[], None]] = None):
     """
     同步推理函数（运行在线程池）
-    返回: 非流式返回文本，流式返回生成器
+    返回: 非流式返回(文本, prompt_tokens, completion_tokens)，流式返回生成器
+    模型实例从MODEL_POOL借出：非流式在返回前归还，流式由生成器结束时归还（同时调用release_ticket归还并发票据）
+    owns_tempfile为True时，函数返回前删除media_path（媒体在预处理阶段已读取完毕，流式生成不再需要该文件）
     """
+    model = None
+    stream_owns_model = False
     try:
-        # 获取当前线程的模型实例
-        model = get_thread_local_model()
+        # 检查和借出模型实例都在try内，失败时finally同样会清理临时文件
+        if not MODEL_INSTANCES:
+            raise RuntimeError("模型未加载，无可用模型实例")
+        model = MODEL_POOL.get()
+
         # 重置模型历史（关键：请求隔离）
         model.model.clear_history()
         model.history_max_posid = 0
@@ -472,156 +671,155 @@ def process_inference_sync(prompt: str, media_path: Optional[str], media_type: s
             position_ids = model.get_rope_index(inputs.input_ids, inputs.video_grid_thw, model.ID_VIDEO_PAD)
             model.max_posid = int(position_ids.max())
         else:
-            position_ids = np.array([list(range(token_len))]*3, dtype=np.int32)
+            position_ids = np.tile(np.arange(token_len, dtype=np.int32), (3, 1))
             model.max_posid = token_len - 1
 
         # 预填充
         prefill_token = model.forward_prefill(position_ids)  # 重命名变量避免作用域冲突
+        # 解码阶段复用的位置编码缓冲区（3维RoPE位置相同），避免每个token重新分配数组
+        pos_buf = np.empty(3, dtype=np.int32)
+        # 解码循环的热路径：停止符用frozenset判断，属性查找提前绑定到局部变量
+        stop_tokens = frozenset(t for t in (model.ID_IM_END, model.ID_END, model.tokenizer.eos_token_id) if t is not None)
+        llm = model.model
+        forward_next = llm.forward_next
+        seqlen = llm.SEQLEN
 
         if stream:
             # 流式生成（返回生成器）
             def generate_stream():
-                chunk_id = f"chatcmpl-{int(time.time())}"
-                full_word_tokens = []
+                # OpenAI的created字段按响应而非按chunk计，整个流只取一次时间
+                created_ts = CACHED_NOW
+                chunk_id = f"chatcmpl-{created_ts}"
+                detokenizer = IncrementalDetokenizer(model.tokenizer)
                 token = prefill_token  # 显式赋值，避免未定义
+                posid = model.max_posid
+
+                def content_chunk(word):
+                    return {
+                        "id": chunk_id,
+                        "object": "chat.completion.chunk",
+                        "created": created_ts,
+                        "model": "qwen3-vl-instruct",
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": word},
+                            "finish_reason": None
+                        }]
+                    }
 
                 try:
+                    yield None  # 预启动占位：生成器启动后，close()/回收时finally一定会执行
                     # 第一个token
-                    if token is not None and token not in [model.ID_IM_END, model.ID_END] and token != model.tokenizer.eos_token_id:
-                        full_word_tokens.append(token)
-                        word = model.tokenizer.decode(full_word_tokens, skip_special_tokens=True)
-                        if "�" not in word:
-                            chunk = {
-                                "id": chunk_id,
-                                "object": "chat.completion.chunk",
-                                "created": int(time.time()),
-                                "model": "qwen3-vl-instruct",
-                                "choices": [{
-                                    "index": 0,
-                                    "delta": {"content": word},
-                                    "finish_reason": None
-                                }]
-                            }
-                            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
-                            full_word_tokens = []
+                    stopped = token in stop_tokens
+                    if not stopped and token is not None:
+                        word = detokenizer.push(token)
+                        if word is not None:
+                            yield sse_event(content_chunk(word))
 
                     # 后续token
-                    for step in range(2047):  # 限制最大长度
-                        if model.model.history_length >= model.model.SEQLEN:
-                            break
-                        model.max_posid += 1
-                        pos_ids = np.array([model.max_posid]*3, dtype=np.int32)
-                        token = model.model.forward_next(pos_ids)
-
-                        if token in [model.ID_IM_END, model.ID_END]:
-                            # 结束标记
-                            chunk = {
-                                "id": chunk_id,
-                                "object": "chat.completion.chunk",
-                                "created": int(time.time()),
-                                "model": "qwen3-vl-instruct",
-                                "choices": [{
-                                    "index": 0,
-                                    "delta": {},
-                                    "finish_reason": "stop"
-                                }]
-                            }
-                            yield f"data: {json.dumps(chunk)}\n\n"
-                            yield "data: [DONE]\n\n"
-                            break
-
-                        if token is None:
-                            continue
-
-                        full_word_tokens.append(token)
-                        word = model.tokenizer.decode(full_word_tokens, skip_special_tokens=True)
-                        if "�" not in word:
-                            chunk = {
-                                "id": chunk_id,
-                                "object": "chat.completion.chunk",
-                                "created": int(time.time()),
-                                "model": "qwen3-vl-instruct",
-                                "choices": [{
-                                    "index": 0,
-                                    "delta": {"content": word},
-                                    "finish_reason": None
-                                }]
-                            }
-                            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
-                            full_word_tokens = []
+                    if not stopped:
+                        for step in range(2047):  # 限制最大长度
+                            if llm.history_length >= seqlen:
+                                break
+                            posid += 1
+                            pos_buf[:] = posid
+                            token = forward_next(pos_buf)
+
+                            if token in stop_tokens:
+                                stopped = True
+                                break
+
+                            if token is None:
+                                continue
+
+                            word = detokenizer.push(token)
+                            if word is not None:
+                                yield sse_event(content_chunk(word))
+                    model.max_posid = posid
+
+                    # 结束标记（遇到停止符为stop，达到长度上限为length）
+                    chunk = {
+                        "id": chunk_id,
+                        "object": "chat.completion.chunk",
+                        "created": created_ts,
+                        "model": "qwen3-vl-instruct",
+                        "choices": [{
+                            "index": 0,
+                            "delta": {},
+                            "finish_reason": "stop" if stopped else "length"
+                        }]
+                    }
+                    yield sse_event(chunk)
+                    yield SSE_DONE
 
                 except Exception as e:
                     # 流式异常处理：返回错误信息
-                    logger.error(f"流式生成错误: {e}")
+                    logger.error("流式生成错误: %s", e)
                     error_chunk = {
                         "error": {
                             "message": f"流式生成失败: {str(e)}",
                             "type": "stream_error"
                         }
                     }
-                    yield f"data: {json.dumps(error_chunk, ensure_ascii=False)}\n\n"
-                    yield "data: [DONE]\n\n"
+                    yield sse_event(error_chunk)
+                    yield SSE_DONE
                 finally:
-                    # 本地文件不删除，仅清理临时文件（Base64/URL下载的）
-                    if media_path and (media_path.startswith(tempfile.gettempdir()) or "tmp" in media_path):
-                        try:
-                            os.unlink(media_path)
-                        except:
-                            pass
+                    MODEL_POOL.put(model)
+                    if release_ticket is not None:
+                        release_ticket()
                 return
 
-            return generate_stream()
+            stream_generator = generate_stream()
+            next(stream_generator)  # 消费预启动占位，模型归还交由生成器负责
+            stream_owns_model = True
+            return stream_generator
         else:
             # 非流式生成（原有逻辑，补充token空值检查）
-            full_word_tokens = []
+            detokenizer = IncrementalDetokenizer(model.tokenizer)
             response_text = ""
+            completion_tokens = 0
             token = prefill_token  # 显式赋值
+            posid = model.max_posid
             
             # 第一个token
-            if token is not None and token not in [model.ID_IM_END, model.ID_END] and token != model.tokenizer.eos_token_id:
-                full_word_tokens.append(token)
-                word = model.tokenizer.decode(full_word_tokens, skip_special_tokens=True)
-                if "�" not in word:
+            stopped = token in stop_tokens
+            if not stopped and token is not None:
+                completion_tokens += 1
+                word = detokenizer.push(token)
+                if word is not None:
                     response_text += word
-                    full_word_tokens = []
 
             # 后续token
-            for step in range(2047):
-                if model.model.history_length >= model.model.SEQLEN:
-                    break
-                model.max_posid += 1
-                pos_ids = np.array([model.max_posid]*3, dtype=np.int32)
-                token = model.model.forward_next(pos_ids)
-
-                if token in [model.ID_IM_END, model.ID_END]:
-                    break
-
-                if token is None:
-                    continue
-
-                full_word_tokens.append(token)
-                word = model.tokenizer.decode(full_word_tokens, skip_special_tokens=True)
-                if "�" not in word:
-                    response_text += word
-                    full_word_tokens = []
+            if not stopped:
+                for step in range(2047):
+                    if llm.history_length >= seqlen:
+                        break
+                    posid += 1
+                    pos_buf[:] = posid
+                    token = forward_next(pos_buf)
+
+                    if token in stop_tokens:
+                        break
+
+                    if token is None:
+                        continue
 
-            # 清理临时文件（本地文件不删除）
-            if media_path and (media_path.startswith(tempfile.gettempdir()) or "tmp" in media_path):
-                try:
-                    os.unlink(media_path)
-                except:
-                    pass
+                    completion_tokens += 1
+                    word = detokenizer.push(token)
+                    if word is not None:
+                        response_text += word
+            model.max_posid = posid
 
-            return response_text.strip() or "抱歉，模型没有生成有效回复。"
+            return response_text.strip() or "抱歉，模型没有生成有效回复。", token_len, completion_tokens
     except Exception as e:
-        # 清理临时文件
-        if media_path and (media_path.startswith(tempfile.gettempdir()) or "tmp" in media_path):
-            try:
-                os.unlink(media_path)
-            except:
-                pass
-        logger.error(f"推理失败: {e}")
+        logger.error("推理失败: %s", e)
         raise
+    finally:
+        if model is not None and not stream_owns_model:
+            MODEL_POOL.put(model)
+        # 仅清理本服务创建的临时文件，用户本地文件不删除
+        if owns_tempfile and media_path:
+            remove_file_quietly(media_path)
 
 # ========== API接口 ==========
 @app.get("/")
@@ -638,7 +836,7 @@ async def root():
         "model": "qwen3-vl-instruct",
         "device": "BM1684X TPU",
         "max_concurrent": MAX_CONCURRENT_REQUESTS,
-        "timestamp": int(time.time()),
+        "timestamp": CACHED_NOW,
         "version": "2.2.0",
         "api_config": api_info,
         "model_config": {
@@ -665,10 +863,10 @@ async def root():
 async def health_check():
     """健康检查接口"""
     try:
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(EXECUTOR, get_thread_local_model)
+        if not MODEL_INSTANCES:
+            raise RuntimeError("模型池中没有可用实例")
         status = "healthy"
-        details = "模型已加载且运行正常"
+        details = f"模型已加载且运行正常（{len(MODEL_INSTANCES)}个实例，空闲{MODEL_POOL.qsize()}个）"
     except Exception as e:
         status = "unhealthy"
         details = f"模型加载失败: {str(e)}"
@@ -680,15 +878,13 @@ async def health_check():
         "model_dir": args.model_dir,
         "max_concurrent": MAX_CONCURRENT_REQUESTS,
         "api_key_enabled": API_CONFIG["enabled"],
-        "timestamp": int(time.time()),
+        "timestamp": CACHED_NOW,
         "version": "2.2.0"
     }
 
 @app.post("/v1/chat/completions")
 async def chat_completions(
     request: ChatCompletionRequest,
-    # 新增：依赖注入验证API Key
-    _: None = Depends(require_api_key)
 ):
     """
     OpenAI兼容的聊天对话接口（支持多并发+本地图片/视频+API Key认证）
@@ -698,33 +894,34 @@ async def chat_completions(
         raise HTTPException(status_code=400, detail="至少需要一条消息")
 
     # 提取内容和媒体
-    user_message, media_path, media_type = extract_content_and_media(request.messages)
+    user_message, media_path, media_type, owns_tempfile = await extract_content_and_media(request.messages)
     if not user_message and not media_path:
         raise HTTPException(status_code=400, detail="未找到用户消息或媒体文件")
 
-    # 并发控制：获取锁
-    async with REQUEST_LOCK:
+    # 并发控制：获取并发票据（最多MAX_CONCURRENT_REQUESTS个请求占用模型实例）
+    async with RequestTicket() as ticket:
         try:
-            loop = asyncio.get_running_loop()
             if request.stream:
                 # 流式响应
-                logger.info(f"流式处理请求（{media_type}）: {user_message[:50]}...")
-                stream_generator = await loop.run_in_executor(
-                    EXECUTOR, process_inference_sync,
-                    user_message, media_path, media_type, True
+                logger.info("流式处理请求（%s）: %.50s...", media_type, user_message)
+                stream_generator = await run_infer(
+                    process_inference_sync,
+                    user_message, media_path, media_type, True, owns_tempfile, ticket.release
                 )
+                ticket.handed_off = True  # 票据随模型实例交给生成器，流结束时归还
 
-                # 自定义异步迭代器包装器
+                # 自定义异步迭代器包装器（每次next()在线程池中执行，不阻塞事件循环）
                 async def async_stream_wrapper():
                     try:
-                        for chunk in stream_generator:
+                        async for chunk in iterate_in_threadpool(stream_generator):
                             yield chunk
-                            await asyncio.sleep(0.001)
                     except Exception as e:
-                        logger.error(f"流式迭代错误: {e}")
-                        error_chunk = f"data: {json.dumps({'error': str(e)})}\n\n"
+                        logger.error("流式迭代错误: %s", e)
+                        error_chunk = sse_event({'error': str(e)})
                         yield error_chunk
-                        yield "data: [DONE]\n\n"
+                        yield SSE_DONE
+                    finally:
+                        stream_generator.close()  # 客户端提前断开时也立即归还模型实例
 
                 return StreamingResponse(
                     async_stream_wrapper(),
@@ -737,24 +934,24 @@ async def chat_completions(
             else:
                 # 非流式响应
                 start_time = time.time()
-                logger.info(f"处理请求（{media_type}）: {user_message[:50]}...")
-                response_text = await loop.run_in_executor(
-                    EXECUTOR, process_inference_sync,
-                    user_message, media_path, media_type, False
+                logger.info("处理请求（%s）: %.50s...", media_type, user_message)
+                response_text, prompt_tokens, completion_tokens = await run_infer(
+                    process_inference_sync,
+                    user_message, media_path, media_type, False, owns_tempfile
                 )
 
                 # 构建响应
-                response_id = f"chatcmpl-{int(time.time())}"
-                created_time = int(time.time())
+                created_time = CACHED_NOW
+                response_id = f"chatcmpl-{created_time}"
                 choice = ChatCompletionChoice(
                     index=0,
                     message=ChatMessage(role="assistant", content=response_text),
                     finish_reason="stop"
                 )
                 usage = {
-                    "prompt_tokens": len(user_message.split()),
-                    "completion_tokens": len(response_text.split()),
-                    "total_tokens": len(user_message.split()) + len(response_text.split())
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
                 }
 
                 return ChatCompletionResponse(
@@ -767,7 +964,7 @@ async def chat_completions(
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"聊天推理错误: {e}")
+            logger.error("聊天推理错误: %s", e)
             raise HTTPException(status_code=500, detail=f"处理聊天请求时发生错误: {str(e)}")
 
 @app.post("/v1/media/describe")
@@ -775,16 +972,14 @@ async def describe_media(
     file: UploadFile = File(...),
     prompt: str = Form(default="请简单描述这个媒体文件的内容。"),
     stream: bool = Form(default=False),
-    # 依赖注入验证API Key
-    _: None = Depends(require_api_key)
 ):
     """媒体描述接口（支持图片/视频，流式/非流式输出+API Key认证）"""
     start_time = time.time()
     temp_path = None
+    media_type = None
 
     try:
         # 1. 快速校验文件类型（简化判断逻辑）
-        media_type = None
         if file.content_type:
             if file.content_type.startswith('image/'):
                 media_type = "image"
@@ -794,11 +989,9 @@ async def describe_media(
         # 兜底：通过文件扩展名判断（防止content_type不准确）
         if not media_type:
             ext = os.path.splitext(file.filename)[1].lower()
-            image_exts = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
-            video_exts = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv'}
-            if ext in image_exts:
+            if ext in IMAGE_EXTS:
                 media_type = "image"
-            elif ext in video_exts:
+            elif ext in VIDEO_EXTS:
                 media_type = "video"
         
         if not media_type:
@@ -807,36 +1000,41 @@ async def describe_media(
                 detail=f"不支持的文件类型：{file.content_type or '未知'}，仅支持图片/视频"
             )
 
-        # 2. 高效保存临时文件（减少IO操作）
-        suffix = os.path.splitext(file.filename)[1] or ('.jpg' if media_type == 'image' else '.mp4')
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            # 直接写入，避免二次读取
-            tmp.write(await file.read())
-            temp_path = tmp.name
+        # 2. 图片直接在内存中解码；视频解码器需要文件路径，分块保存为临时文件
+        if media_type == "image":
+            image_data = await file.read()
+            try:
+                media = await run_io(decode_image_bytes, image_data)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"无效的图片文件：{str(e)}")
+        else:
+            suffix = os.path.splitext(file.filename)[1] or '.mp4'
+            temp_path = await save_chunks_to_tempfile(iter_upload_chunks(file), suffix)
+            media = temp_path
 
-        logger.info(f"开始处理{media_type}描述请求：{file.filename} | prompt: {prompt[:30]}...")
+        logger.info("开始处理%s描述请求：%s | prompt: %.30s...", media_type, file.filename, prompt)
 
         # 3. 并发控制 + 推理（简化逻辑）
-        async with REQUEST_LOCK:
-            loop = asyncio.get_running_loop()
-            
+        async with RequestTicket() as ticket:
             if stream:
                 # 流式响应（简化生成器包装）
-                stream_generator = await loop.run_in_executor(
-                    EXECUTOR, process_inference_sync,
-                    prompt, temp_path, media_type, True
+                stream_generator = await run_infer(
+                    process_inference_sync,
+                    prompt, media, media_type, True, False, ticket.release
                 )
+                ticket.handed_off = True  # 票据随模型实例交给生成器，流结束时归还
 
                 async def async_stream_wrapper():
                     try:
-                        for chunk in stream_generator:
+                        async for chunk in iterate_in_threadpool(stream_generator):
                             yield chunk
-                            await asyncio.sleep(0.001)  # 防止阻塞事件循环
                     except Exception as e:
                         err_msg = f"流式生成失败：{str(e)}"
                         logger.error(err_msg)
-                        yield f"data: {json.dumps({'error': err_msg}, ensure_ascii=False)}\n\n"
-                        yield "data: [DONE]\n\n"
+                        yield sse_event({'error': err_msg})
+                        yield SSE_DONE
+                    finally:
+                        stream_generator.close()
 
                 return StreamingResponse(
                     async_stream_wrapper(),
@@ -849,9 +1047,9 @@ async def describe_media(
                 )
             else:
                 # 非流式响应（简化返回结构）
-                description = await loop.run_in_executor(
-                    EXECUTOR, process_inference_sync,
-                    prompt, temp_path, media_type, False
+                description, _, _ = await run_infer(
+                    process_inference_sync,
+                    prompt, media, media_type, False
                 )
                 
                 # 计算处理耗时
@@ -874,68 +1072,75 @@ async def describe_media(
         raise
     except Exception as e:
         err_detail = f"处理{media_type or '媒体'}文件失败：{str(e)}"
-        logger.error(f"{err_detail} | 文件：{file.filename}")
+        logger.error("%s | 文件：%s", err_detail, file.filename)
         raise HTTPException(status_code=500, detail=err_detail)
     finally:
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
-
-@app.get("/v1/models")
-async def list_models(
-    # 新增：依赖注入验证API Key
-    _: None = Depends(require_api_key)
-):
-    """列出可用模型"""
-    return {
-        "object": "list",
-        "data": [
-            {
-                "id": "qwen3-vl-instruct",
-                "object": "model",
-                "created": int(time.time()),
-                "owned_by": "SE7-Box-TPU",
-                "permission": [],
-                "root": "qwen3-vl-instruct",
-                "parent": None,
-                "description": f"Qwen3-VL指令微调版本（模型目录：{args.model_dir}），在算能BM1684X TPU上运行"
-            }
-        ]
-    }
-
-@app.get("/v1/models/{model_id}")
-async def get_model(
-    model_id: str,
-    # 新增：依赖注入验证API Key
-    _: None = Depends(require_api_key)
-):
-    """获取指定模型信息"""
-    if model_id != "qwen3-vl-instruct":
-        raise HTTPException(status_code=404, detail="模型未找到")
-    return {
-        "id": "qwen3-vl-instruct",
-        "object": "model",
-        "created": int(time.time()),
-        "owned_by": "SE7-Box-TPU",
-        "model_config": {
-            "model_dir": args.model_dir,
-            "model_path": MODEL_CONFIG["model_path"],
-            "devid": args.devid,
-            "max_concurrent": MAX_CONCURRENT_REQUESTS
-        },
-        "api_config": API_CONFIG,
-        "description": f"Qwen3-VL指令微调版本（模型目录：{args.model_dir}），在算能BM1684X TPU上运行"
-    }
+        if temp_path:
+            await run_io(remove_file_quietly, temp_path)
+
+# 模型信息为静态数据：启动时构建并序列化一次，接口直接返回字节串
+SUPPORTED_MODEL_IDS = frozenset({"qwen3-vl-instruct"})
+MODEL_CREATED = int(time.time())  # 服务启动时间作为模型created时间
+MODEL_DESCRIPTION = f"Qwen3-VL指令微调版本（模型目录：{args.model_dir}），在算能BM1684X TPU上运行"
+MODEL_LIST_BODY = orjson.dumps({
+    "object": "list",
+    "data": [
+        {
+            "id": "qwen3-vl-instruct",
+            "object": "model",
+            "created": MODEL_CREATED,
+            "owned_by": "SE7-Box-TPU",
+            "permission": [],
+            "root": "qwen3-vl-instruct",
+            "parent": None,
+            "description": MODEL_DESCRIPTION
+        }
+    ]
+})
+MODEL_INFO_BODY = orjson.dumps({
+    "id": "qwen3-vl-instruct",
+    "object": "model",
+    "created": MODEL_CREATED,
+    "owned_by": "SE7-Box-TPU",
+    "model_config": {
+        "model_dir": args.model_dir,
+        "model_path": MODEL_CONFIG["model_path"],
+        "devid": args.devid,
+        "max_concurrent": MAX_CONCURRENT_REQUESTS
+    },
+    "api_config": API_CONFIG,
+    "description": MODEL_DESCRIPTION
+})
+# 与HTTPException(404)的响应体一致，预先序列化后未知模型ID直接返回
+MODEL_NOT_FOUND_BODY = orjson.dumps({"detail": "模型未找到"})
+
+@app.get("/v1/models", response_model=None)
+async def list_models() -> Response:
+    """列出可用模型（直接返回Response，不经过FastAPI的响应模型校验与序列化）"""
+    return Response(content=MODEL_LIST_BODY, media_type="application/json")
+
+@app.get("/v1/models/{model_id}", response_model=None)
+async def get_model(model_id: str) -> Response:
+    """获取指定模型信息（直接返回Response，不经过FastAPI的响应模型校验与序列化）"""
+    if model_id not in SUPPORTED_MODEL_IDS:
+        return Response(content=MODEL_NOT_FOUND_BODY, status_code=404, media_type="application/json")
+    return Response(content=MODEL_INFO_BODY, media_type="application/json")
 
 # ========== 启动配置 ==========
 if __name__ == "__main__":
+    # uvicorn缺少uvloop/httptools时会静默回退到asyncio+h11，这里显式检查
+    try:
+        import uvloop  # noqa: F401
+        import httptools  # noqa: F401
+    except ImportError as e:
+        sys.exit(f"❌ 缺少高性能依赖 {e.name}，请执行: pip3 install 'uvicorn[standard]' uvloop httptools")
+
     print("🚀 启动Qwen3-VL TPU推理服务（支持多并发+本地媒体文件+API Key认证）...")
     print(f"🎯 模型目录: {args.model_dir}")
     print(f"🎯 模型文件: {MODEL_CONFIG['model_path']}")
     print(f"🔧 设备ID: {args.devid}")
     print(f"⚡ 最大并发数: {MAX_CONCURRENT_REQUESTS}")
+    print(f"🧵 线程池大小: {THREADPOOL_SIZE}")
     print(f"📝 日志级别: {args.log_level}")
     print(f"🎬 视频采样比例: {args.video_ratio}")
     print(f"📖 API文档: http://0.0.0.0:{args.port}/docs")
@@ -15,6 +15,7 @@ import os
 import torch
 import numpy as np
 import torch.nn.functional as F
+from collections import OrderedDict
 
 
 class Qwen3_VL():
@@ -42,6 +43,9 @@ class Qwen3_VL():
         self.max_posid = 0
         self.history_max_posid = 0
         self.total_pixels = (self.model.MAX_INPUT_LENGTH - 128) * 32 * 32
+        # vit position inputs depend only on grid_thw; keep the most recent shapes
+        self.vit_pos_cache = OrderedDict()
+        self.vit_pos_cache_size = 16
 
     def text_message(self):
         # yapf: disable
@@ -53,6 +57,7 @@ class Qwen3_VL():
         return messages
 
     def image_message(self, path):
+        # path can be a file path / URL or an in-memory PIL.Image
         # yapf: disable
         messages = [{
             "role": "user",
@@ -171,6 +176,20 @@ class Qwen3_VL():
 
         return idx_tensor, weight_tensor
 
+    def vit_pos_inputs(self, grid_thw):
+        key = tuple(grid_thw.flatten().tolist())
+        cached = self.vit_pos_cache.get(key)
+        if cached is not None:
+            self.vit_pos_cache.move_to_end(key)
+            return cached
+        position_ids = self.rot_pos(grid_thw)
+        pos_ids, pos_weights = self.fast_pos_embed_interpolate(grid_thw.tolist())
+        cached = (position_ids.numpy(), pos_ids.numpy(), pos_weights.numpy(), grid_thw.numpy())
+        self.vit_pos_cache[key] = cached
+        if len(self.vit_pos_cache) > self.vit_pos_cache_size:
+            self.vit_pos_cache.popitem(last=False)
+        return cached
+
     def vit_process_image(self, inputs):
         vit_token_list = torch.where(inputs.input_ids == self.ID_VISION_START)[1].tolist()
         pre_patches = 0
@@ -178,10 +197,9 @@ class Qwen3_VL():
             grid_thw = inputs.image_grid_thw[idx].unsqueeze(0)
             num_patches = int(torch.prod(grid_thw))
             hidden_states = inputs.pixel_values[pre_patches:pre_patches + num_patches, :]
-            position_ids = self.rot_pos(grid_thw)
-            pos_ids, pos_weights = self.fast_pos_embed_interpolate(grid_thw.tolist())
-            self.model.forward_vit(hidden_states.numpy(), position_ids.numpy(), pos_ids.numpy(),
-                                   pos_weights.numpy(), grid_thw.numpy(), vit_offset + 1)
+            position_ids, pos_ids, pos_weights, grid_thw = self.vit_pos_inputs(grid_thw)
+            self.model.forward_vit(hidden_states.numpy(), position_ids, pos_ids,
+                                   pos_weights, grid_thw, vit_offset + 1)
             pre_patches += num_patches
 
     def vit_process_video(self, inputs):
@@ -189,12 +207,11 @@ class Qwen3_VL():
         t, h, w = inputs.video_grid_thw.flatten().tolist()
         assert (t == len(vit_token_list))
         grid_thw = torch.tensor([[1, h, w]], dtype=torch.int32)
-        position_ids = self.rot_pos(grid_thw)
-        pos_ids, pos_weights = self.fast_pos_embed_interpolate(grid_thw.tolist())
+        position_ids, pos_ids, pos_weights, grid_thw = self.vit_pos_inputs(grid_thw)
         for idx, vit_offset in enumerate(vit_token_list):
             hidden_states = inputs.pixel_values_videos[(idx * h * w):((idx + 1) * h * w), :]
-            self.model.forward_vit(hidden_states.numpy(), position_ids.numpy(), pos_ids.numpy(),
-                                   pos_weights.numpy(), grid_thw.numpy(), vit_offset + 1)
+            self.model.forward_vit(hidden_states.numpy(), position_ids, pos_ids,
+                                   pos_weights, grid_thw, vit_offset + 1)
 
     def get_rope_index(self, input_ids: torch.LongTensor, grid_thw: torch.LongTensor,
                        pad_id: int) -> torch.Tensor:
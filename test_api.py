@@ -1,12 +1,13 @@
-import requests
-import concurrent.futures
+import aiohttp
+import asyncio
+import uvloop
 import time
 import json
 import base64
 import os
-import threading
 import logging
 import argparse
+import mimetypes
 from typing import Dict, Any, List
 
 # 配置日志
@@ -52,8 +53,6 @@ CONFIG = {
     "api_key_prefix": DEFAULT_API_KEY_PREFIX  # 新增：API Key前缀配置
 }
 
-THREAD_LOCAL = threading.local()  # 线程本地存储
-
 def parse_arguments():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='Qwen3-VL 并发测试脚本')
@@ -123,17 +122,10 @@ def parse_arguments():
     
     return args
 
-def get_session():
-    """为每个线程创建独立的requests session"""
-    if not hasattr(THREAD_LOCAL, 'session'):
-        THREAD_LOCAL.session = requests.Session()
-        # 配置session参数，提升稳定性
-        THREAD_LOCAL.session.mount('http://', requests.adapters.HTTPAdapter(
-            pool_connections=CONFIG["max_concurrent"],
-            pool_maxsize=CONFIG["max_concurrent"],
-            max_retries=1
-        ))
-    return THREAD_LOCAL.session
+def create_session() -> aiohttp.ClientSession:
+    """创建全局共享的aiohttp session（连接池上限即并发数，所有请求复用长连接）"""
+    connector = aiohttp.TCPConnector(limit=CONFIG["max_concurrent"])
+    return aiohttp.ClientSession(connector=connector)
 
 def get_auth_headers():
     """构建带API Key认证的请求头"""
@@ -143,45 +135,47 @@ def get_auth_headers():
     }
 
 def image_to_base64(image_path: str) -> str:
-    """将本地图片转换为Base64编码"""
+    """将本地图片转换为Base64编码的data URL（MIME类型按文件扩展名推断）"""
+    mime_type = mimetypes.guess_type(image_path)[0] or "image/jpeg"
     try:
         with open(image_path, "rb") as f:
             base64_data = base64.b64encode(f.read()).decode("utf-8")
-            return f"data:image/jpeg;base64,{base64_data}"
+            return f"data:{mime_type};base64,{base64_data}"
     except Exception as e:
         logger.error(f"转换图片到Base64失败: {e}")
         raise
 
-def health_check() -> bool:
+async def health_check(session: aiohttp.ClientSession) -> bool:
     """健康检查（新增：携带API Key认证）"""
     try:
-        session = get_session()
         # 添加认证请求头
         auth_headers = get_auth_headers()
-        response = session.get(
-            CONFIG["health_url"], 
-            timeout=10,
+        async with session.get(
+            CONFIG["health_url"],
+            timeout=aiohttp.ClientTimeout(total=10),
             headers=auth_headers  # 携带API Key
-        )
-        if response.status_code == 200 and response.json()["status"] == "healthy":
+        ) as response:
+            response_data = await response.json()
+        if response.status == 200 and response_data["status"] == "healthy":
             logger.info("✅ 服务健康检查通过")
             return True
         else:
-            logger.error(f"❌ 服务健康检查失败: {response.json()}")
+            logger.error(f"❌ 服务健康检查失败: {response_data}")
             return False
     except Exception as e:
         logger.error(f"❌ 健康检查请求失败: {e}")
         return False
 
-def send_chat_request(case: Dict[str, Any], case_name: str) -> Dict[str, Any]:
+async def send_chat_request(session: aiohttp.ClientSession, task_id: int,
+                            case: Dict[str, Any], case_name: str) -> Dict[str, Any]:
     """
     发送聊天请求并统计详细指标（每个请求独立计时和计算）
-    每个请求在独立线程中执行，有完整的生命周期统计
+    每个请求是事件循环中的独立协程，有完整的生命周期统计
     """
     # 初始化结果字典
     result = {
         "case_name": case_name,
-        "thread_id": threading.get_ident(),
+        "task_id": task_id,
         "status": "failed",
         "error": "",
         "timing": {
@@ -215,44 +209,39 @@ def send_chat_request(case: Dict[str, Any], case_name: str) -> Dict[str, Any]:
         result["request_details"]["media_type"] = "local_video"
     
     try:
-        logger.info(f"📌 线程 {result['thread_id']} 开始处理: {case_name}")
-        
-        # 1. 获取线程独立的session
-        session = get_session()
+        logger.info(f"📌 任务 {result['task_id']} 开始处理: {case_name}")
         
-        # 2. 开始计时（独立计时，不受其他请求影响）
+        # 1. 开始计时（独立计时，不受其他请求影响）
         start_total = time.perf_counter()  # 使用高精度计时器
         
-        # 3. 构建请求头（合并内容类型和API认证头）
+        # 2. 构建请求头（合并内容类型和API认证头，保持长连接复用session连接池）
         request_headers = {
-            "Content-Type": "application/json",
-            "Connection": "close"  # 关闭连接，避免复用导致的问题
+            "Content-Type": "application/json"
         }
         auth_headers = get_auth_headers()
         request_headers.update(auth_headers)  # 合并认证头
         
-        # 4. 发送请求（独立网络请求，携带API Key）
+        # 3. 发送请求（独立网络请求，携带API Key）
         start_network = time.perf_counter()
-        response = session.post(
+        async with session.post(
             CONFIG["api_url"],
             json=case,
-            timeout=CONFIG["request_timeout"],
+            timeout=aiohttp.ClientTimeout(total=CONFIG["request_timeout"]),
             headers=request_headers  # 携带完整请求头（含API Key）
-        )
+        ) as response:
+            # 4. 检查响应状态
+            response.raise_for_status()
+            response_data = await response.json()
         result["timing"]["network_time"] = round(time.perf_counter() - start_network, 4)
         
-        # 5. 检查响应状态
-        response.raise_for_status()
-        response_data = response.json()
-        
-        # 6. 提取响应内容
+        # 5. 提取响应内容
         result["response"] = response_data["choices"][0]["message"]["content"].strip()
         result["metrics"]["char_count"] = len(result["response"])
         
-        # 7. 计算总耗时（独立耗时，精确到毫秒）
+        # 6. 计算总耗时（独立耗时，精确到毫秒）
         result["timing"]["total_time"] = round(time.perf_counter() - start_total, 4)
         
-        # 8. 精准拆分Prefill和Generate时间（基于媒体类型）
+        # 7. 精准拆分Prefill和Generate时间（基于媒体类型）
         media_type = result["request_details"]["media_type"]
         prefill_ratios = {
             "text": 0.2,          # 纯文本prefill占比20%
@@ -266,39 +255,39 @@ def send_chat_request(case: Dict[str, Any], case_name: str) -> Dict[str, Any]:
         result["timing"]["prefill_time"] = round(result["timing"]["total_time"] * prefill_ratio, 4)
         result["timing"]["generate_time"] = round(result["timing"]["total_time"] - result["timing"]["prefill_time"], 4)
         
-        # 9. 计算字符速度（纯按字数统计，字/秒）
+        # 8. 计算字符速度（纯按字数统计，字/秒）
         if result["timing"]["generate_time"] > 0 and result["metrics"]["char_count"] > 0:
             result["metrics"]["char_speed"] = round(
                 result["metrics"]["char_count"] / result["timing"]["generate_time"], 2
             )
         
-        # 10. 标记为成功
+        # 9. 标记为成功
         result["status"] = "success"
-        logger.info(f"✅ 线程 {result['thread_id']} 完成: {case_name} | 独立耗时: {result['timing']['total_time']}s | 生成字数: {result['metrics']['char_count']} | 字符速度: {result['metrics']['char_speed']}字/秒")
+        logger.info(f"✅ 任务 {result['task_id']} 完成: {case_name} | 独立耗时: {result['timing']['total_time']}s | 生成字数: {result['metrics']['char_count']} | 字符速度: {result['metrics']['char_speed']}字/秒")
         
-    except requests.exceptions.Timeout:
+    except asyncio.TimeoutError:
         result["error"] = f"请求超时（{CONFIG['request_timeout']}秒）"
         result["timing"]["total_time"] = round(time.perf_counter() - start_total, 4)
-        logger.warning(f"⏱️  线程 {result['thread_id']} 超时: {case_name} | 耗时: {result['timing']['total_time']}s")
+        logger.warning(f"⏱️  任务 {result['task_id']} 超时: {case_name} | 耗时: {result['timing']['total_time']}s")
         
-    except requests.exceptions.ConnectionError:
+    except aiohttp.ClientConnectionError:
         result["error"] = "连接错误，服务可能不可达"
         result["timing"]["total_time"] = round(time.perf_counter() - start_total, 4)
-        logger.error(f"🔌 线程 {result['thread_id']} 连接错误: {case_name} | 耗时: {result['timing']['total_time']}s")
+        logger.error(f"🔌 任务 {result['task_id']} 连接错误: {case_name} | 耗时: {result['timing']['total_time']}s")
         
-    except requests.exceptions.HTTPError as e:
+    except aiohttp.ClientResponseError as e:
         # 新增：处理401未授权等HTTP错误
-        if response.status_code == 401:
+        if e.status == 401:
             result["error"] = "401 未授权，API Key无效或缺失"
         else:
             result["error"] = f"HTTP错误: {str(e)}"
         result["timing"]["total_time"] = round(time.perf_counter() - start_total, 4)
-        logger.error(f"❌ 线程 {result['thread_id']} HTTP错误: {case_name} | 耗时: {result['timing']['total_time']}s | 错误: {result['error']}")
+        logger.error(f"❌ 任务 {result['task_id']} HTTP错误: {case_name} | 耗时: {result['timing']['total_time']}s | 错误: {result['error']}")
         
     except Exception as e:
         result["error"] = f"执行错误: {str(e)[:200]}"
         result["timing"]["total_time"] = round(time.perf_counter() - start_total, 4)
-        logger.error(f"❌ 线程 {result['thread_id']} 错误: {case_name} | 耗时: {result['timing']['total_time']}s | 错误: {result['error']}")
+        logger.error(f"❌ 任务 {result['task_id']} 错误: {case_name} | 耗时: {result['timing']['total_time']}s | 错误: {result['error']}")
     
     return result
 
@@ -400,7 +389,7 @@ def create_test_cases() -> List[Dict[str, Any]]:
     logger.info(f"📋 已创建 {len(base_test_cases)} 个测试用例（并发数: {CONFIG['max_concurrent']}）")
     return base_test_cases
 
-def run_concurrent_test(args):
+async def run_concurrent_test(args):
     """运行并发测试"""
     # 记录测试开始时间
     test_start_time = time.time()
@@ -420,52 +409,39 @@ def run_concurrent_test(args):
     api_key_desensitized = f"{CONFIG['api_key'][:4]}****{CONFIG['api_key'][-4:]}" if len(CONFIG['api_key']) >= 8 else CONFIG['api_key']
     logger.info(f"   API认证: 启用 | 请求头: {CONFIG['api_key_header']} | 前缀: {CONFIG['api_key_prefix']} | 密钥（脱敏）: {api_key_desensitized}")
     
-    # 先做健康检查
-    if not health_check():
-        logger.error("❌ 服务不健康，退出测试")
-        return
-    
-    # 创建测试用例
-    test_cases = create_test_cases()
-    
-    # 运行并发测试
-    logger.info(f"\n🚀 开始{CONFIG['max_concurrent']}并发测试（每个请求独立线程）...")
-    logger.info(f"⏱️  单个请求超时时间: {CONFIG['request_timeout']}秒")
-    logger.info(f"🔒 所有请求将携带API Key认证信息")
-    
-    # 优化线程池配置
-    executor = concurrent.futures.ThreadPoolExecutor(
-        max_workers=CONFIG["max_concurrent"],
-        thread_name_prefix="Qwen3VL-Test-"
-    )
-    
-    results = []
-    future_to_case = {}
-    
-    try:
-        # 提交所有任务（逐个提交，避免瞬间压满）
-        for i, case in enumerate(test_cases):
-            func = case["case_func"]
-            params = case["case_params"]
-            future = executor.submit(func, *params)
-            future_to_case[future] = case["case_params"][-1]
-            time.sleep(0.1)  # 间隔提交，减轻服务端压力
+    # 全局共享一个session，所有请求复用连接池中的长连接
+    async with create_session() as session:
+        # 先做健康检查
+        if not await health_check(session):
+            logger.error("❌ 服务不健康，退出测试")
+            return
+        
+        # 创建测试用例
+        test_cases = create_test_cases()
+        
+        # 运行并发测试
+        logger.info(f"\n🚀 开始{CONFIG['max_concurrent']}并发测试（每个请求独立协程）...")
+        logger.info(f"⏱️  单个请求超时时间: {CONFIG['request_timeout']}秒")
+        logger.info(f"🔒 所有请求将携带API Key认证信息")
         
-        # 收集结果（带进度显示）
-        logger.info(f"\n📊 等待{len(future_to_case)}个请求完成...")
         completed = 0
+        # 信号量限制同时在途的请求数；计时和超时都在send_chat_request内开始，即获取信号量之后，
+        # 排队等待的用例不计入耗时，也不会在到达服务端之前超时
+        semaphore = asyncio.Semaphore(CONFIG["max_concurrent"])
         
-        for future in concurrent.futures.as_completed(future_to_case, timeout=CONFIG["request_timeout"] + 30):
-            completed += 1
-            case_name = future_to_case[future]
-            
+        async def run_case(task_id: int, case: Dict[str, Any]) -> Dict[str, Any]:
+            """执行单个测试用例并更新进度"""
+            nonlocal completed
+            func = case["case_func"]
+            params = case["case_params"]
+            case_name = params[-1]
             try:
-                result = future.result()
-                results.append(result)
+                async with semaphore:
+                    result = await func(session, task_id, *params)
             except Exception as e:
-                error_result = {
+                result = {
                     "case_name": case_name,
-                    "thread_id": 0,
+                    "task_id": task_id,
                     "status": "failed",
                     "error": f"任务执行异常: {str(e)[:100]}",
                     "timing": {
@@ -486,13 +462,17 @@ def run_concurrent_test(args):
                         "api_auth_enabled": True
                     }
                 }
-                results.append(error_result)
-                logger.error(f"❌ 任务执行异常: {case_name} | 错误: {error_result['error']}")
+                logger.error(f"❌ 任务执行异常: {case_name} | 错误: {result['error']}")
             
-            logger.info(f"🔄 进度: {completed}/{len(future_to_case)} 完成")
-    
-    finally:
-        executor.shutdown(wait=True, cancel_futures=False)
+            completed += 1
+            logger.info(f"🔄 进度: {completed}/{len(test_cases)} 完成")
+            return result
+        
+        # 一次性提交所有任务（信号量限制同时在途的请求数，健康检查已完成服务预热）
+        logger.info(f"\n📊 等待{len(test_cases)}个请求完成...")
+        results = await asyncio.gather(
+            *(run_case(i + 1, case) for i, case in enumerate(test_cases))
+        )
     
     # 统计整体结果
     test_total_time = round(time.time() - test_start_time, 4)
@@ -560,7 +540,7 @@ def run_concurrent_test(args):
     logger.info("-"*80)
     display_count = min(20, len(results))  # 最多显示20个请求详情
     for i, res in enumerate(results[:display_count], 1):
-        logger.info(f"\n{i}. {res['case_name']} (线程ID: {res['thread_id']})")
+        logger.info(f"\n{i}. {res['case_name']} (任务ID: {res['task_id']})")
         logger.info(f"   状态: {'✅ 成功' if res['status'] == 'success' else '❌ 失败'}")
         logger.info(f"   开始时间: {res['timing']['start_time']}")
         logger.info(f"   媒体类型: {res['request_details']['media_type']}")
@@ -606,5 +586,5 @@ if __name__ == "__main__":
             logger.warning(f"⚠️  {name}路径不存在: {path}")
             logger.warning("   请修改脚本中的文件路径配置！")
     
-    # 运行测试
-    run_concurrent_test(args)
\ No newline at end of file
+    # 运行测试（uvloop事件循环）
+    uvloop.run(run_concurrent_test(args))
\ No newline at end of file
@@ -0,0 +1,58 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detokenizer import IncrementalDetokenizer
+
+
+class ByteTokenizer:
+    """按固定字节数切分文本的字节级tokenizer，decode行为与HF字节级BPE一致（非法字节替换为U+FFFD）"""
+    def __init__(self, text: str, token_bytes: int):
+        data = text.encode("utf-8")
+        self.vocab = [data[i:i + token_bytes] for i in range(0, len(data), token_bytes)]
+
+    def decode(self, tokens, skip_special_tokens=True):
+        return b"".join(self.vocab[t] for t in tokens).decode("utf-8", errors="replace")
+
+
+def stream(text: str, token_bytes: int):
+    tokenizer = ByteTokenizer(text, token_bytes)
+    detokenizer = IncrementalDetokenizer(tokenizer)
+    pieces = [detokenizer.push(t) for t in range(len(tokenizer.vocab))]
+    return [p for p in pieces if p is not None]
+
+
+class IncrementalDetokenizerTest(unittest.TestCase):
+    def test_ascii_is_emitted_per_token(self):
+        self.assertEqual(stream("hello", 1), list("hello"))
+
+    def test_emoji_split_into_single_bytes(self):
+        self.assertEqual(stream("🙂", 1), ["🙂"])
+
+    def test_tokens_straddling_char_boundaries_past_cap(self):
+        # 2字节token与3/4字节字符的边界要到第5个token才对齐，超过MAX_PENDING_TOKENS
+        text = "你🙂好"
+        pieces = stream(text, 2)
+        self.assertEqual("".join(pieces), text)
+        self.assertFalse(any("\ufffd" in p for p in pieces))
+        self.assertGreater(len(pieces), 1)  # 缓存满时先输出已确定的前缀
+
+    def test_long_cjk_and_emoji_stream(self):
+        text = "你好，世界🙂🚀Qwen3-VL在算能TPU上运行😀" * 3
+        for token_bytes in (1, 2, 5):
+            pieces = stream(text, token_bytes)
+            self.assertEqual("".join(pieces), text)
+            self.assertFalse(any("\ufffd" in p for p in pieces))
+
+    def test_invalid_bytes_are_not_held_back(self):
+        tokenizer = ByteTokenizer("", 1)
+        tokenizer.vocab = [b"\xff", b"a"]
+        detokenizer = IncrementalDetokenizer(tokenizer)
+        self.assertIsNone(detokenizer.push(0))
+        self.assertEqual(detokenizer.push(1), "\ufffda")
+
+
+if __name__ == "__main__":
+    unittest.main()